@@ -1,15 +1,17 @@
 import pandas as pd
+import numpy as np
 import os
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image
 from io import BytesIO
-from bs4 import BeautifulSoup
-import html5lib
-from urllib.parse import urlparse
 import socket
 import logging
 import re
+import functools
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 
 # Set up logging
 logging.basicConfig(
@@ -18,34 +20,119 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def is_valid_url(url):
-    """Validate URL format and domain existence"""
+# Shared HTTP session so image downloads reuse pooled connections
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=32, pool_maxsize=32))
+SESSION.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
+# Maximum number of image URLs checked concurrently
+MAX_IMAGE_WORKERS = 16
+
+# Optional price columns
+TRADER_PRICE_COLUMN = 'Variant Metafield:product.trader-price [single_line_text_field]'
+DEALER_PRICE_COLUMN = 'Variant Metafield:product.dealer-price [single_line_text_field]'
+
+# Messages for every combination of failed price hierarchy checks, indexed by bit code
+PRICE_HIERARCHY_CHECKS = [
+    "Variant Price must be greater than Trader Price",
+    "Trader Price must be greater than Dealer Price",
+    "Dealer Price must be greater than Variant Cost",
+    "Dealer Price must not exceed (Variant Price / 1.2) * 0.9",
+]
+PRICE_HIERARCHY_MESSAGES = np.array([
+    "; ".join(message for bit, message in enumerate(PRICE_HIERARCHY_CHECKS) if code >> bit & 1)
+    for code in range(2 ** len(PRICE_HIERARCHY_CHECKS))
+], dtype=object)
+
+# Image file extensions accepted in image URLs
+VALID_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+# Scheme, host and path of a URL, used for whole-column URL checks
+URL_PARTS_PATTERN = r'^([A-Za-z][A-Za-z0-9+.-]*)://([^/?#]+)([^?#]*)'
+
+# URLs inside HTML src attributes
+SRC_ATTRIBUTE_RE = re.compile(r'(?:src=[\'"])(.*?)(?:[\'"])')
+
+# Columns the validators read; everything else is skipped when loading the file
+REQUIRED_COLUMNS = ['Variant SKU', 'Title', 'Variant Position', 'Variant Price', 'Variant Cost']
+VALIDATED_COLUMNS = set(REQUIRED_COLUMNS) | {TRADER_PRICE_COLUMN, DEALER_PRICE_COLUMN, 'Image Src'}
+
+# Columns of the issues DataFrame returned by validate_product_data
+ISSUE_COLUMNS = ['Variant SKU', 'Message']
+
+# Text columns are loaded as Arrow-backed strings when pyarrow is available
+TEXT_DTYPE = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') else 'string'
+TEXT_COLUMNS = ['Variant SKU', 'Title', 'Image Src']
+
+# calamine reads workbooks much faster than openpyxl, which stays as a fallback
+EXCEL_READER_ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') else None
+
+# xlsxwriter writes large reports much faster than openpyxl, which stays as a fallback
+EXCEL_WRITER_ENGINE = 'xlsxwriter' if importlib.util.find_spec('xlsxwriter') else 'openpyxl'
+
+# Bytes requested to read image headers before falling back to a full download
+IMAGE_PROBE_LIMIT = 128 * 1024
+
+@functools.lru_cache(maxsize=4096)
+def is_valid_domain(host):
+    """Check that a host name resolves, caching the answer per host"""
     try:
-        result = urlparse(url.strip())
-        if not all([result.scheme, result.netloc]):
-            return False, "Invalid URL format"
-            
-        # Basic domain check
-        try:
-            socket.gethostbyname(result.netloc)
-        except socket.gaierror:
-            return False, "Domain not resolvable"
-            
-        valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-        path_lower = result.path.lower()
-        if not any(path_lower.endswith(ext) for ext in valid_extensions):
-            return False, "Invalid image extension"
-            
-        return True, ""
-    except Exception as e:
-        return False, str(e)
+        socket.gethostbyname(host)
+        return True
+    except (socket.gaierror, UnicodeError):
+        return False
 
+def validate_urls_vectorized(urls, executor=None):
+    """Validate URL format, domain and extension for a whole series of URLs
+    
+    Returns a validity mask and the failure reason for each URL. Each distinct
+    host is resolved only once, concurrently when an executor is given.
+    """
+    parts = urls.str.strip().str.extract(URL_PARTS_PATTERN)
+    has_scheme_netloc = parts[0].notna()
+    
+    hosts = parts[1]
+    unique_hosts = hosts.dropna().unique().tolist()
+    resolve = executor.map if executor is not None else map
+    resolvable = dict(zip(unique_hosts, resolve(is_valid_domain, unique_hosts)))
+    domain_resolvable = hosts.map(resolvable).fillna(False).astype(bool)
+    
+    has_valid_ext = parts[2].str.lower().str.endswith(VALID_IMAGE_EXTENSIONS).fillna(False).astype(bool)
+    
+    reasons = pd.Series(np.select(
+        [~has_scheme_netloc, ~domain_resolvable, ~has_valid_ext],
+        ["Invalid URL format", "Domain not resolvable", "Invalid image extension"],
+        default=""
+    ), index=urls.index)
+    return reasons == "", reasons
+
+def read_image_size(data):
+    """Read image size from the image header in data
+    
+    Image.open only parses the header, so data may be a truncated image.
+    """
+    with Image.open(BytesIO(data)) as img:
+        return img.size
+
+@functools.lru_cache(maxsize=16384)
 def validate_image_dimensions(url, timeout=10):
     """Validate image dimensions are either 825x825 or maintain 1:1 ratio"""
     try:
-        response = requests.get(url, timeout=timeout)
-        img = Image.open(BytesIO(response.content))
-        width, height = img.size
+        # Request only the start of the file, which holds the image header. The body is
+        # read in full, so the connection goes back to the session pool.
+        response = SESSION.get(
+            url,
+            headers={'Range': f'bytes=0-{IMAGE_PROBE_LIMIT - 1}'},
+            timeout=timeout
+        )
+        try:
+            width, height = read_image_size(response.content)
+        except Exception:
+            # Retry with the whole file only if the range response was cut short
+            if response.status_code != 206 or len(response.content) < IMAGE_PROBE_LIMIT:
+                raise
+            response = SESSION.get(url, timeout=timeout)
+            width, height = read_image_size(response.content)
         
         if width == 825 and height == 825:
             return True, ""
@@ -61,142 +148,196 @@ def validate_image_dimensions(url, timeout=10):
     except Exception as e:
         return False, f"Error validating image dimensions: {str(e)}"
 
-def validate_image_urls(urls_str):
-    """Validate multiple image URLs separated by semicolons"""
-    if not urls_str or pd.isna(urls_str):
-        return False, "Missing image URL"
-    
+def extract_image_urls(urls_str):
+    """Extract image URLs from a semicolon separated cell"""
     urls = []
     for url_part in str(urls_str).split(';'):
         # Extract URLs from possible HTML src attributes
-        matches = re.findall(r'(?:src=[\'"])(.*?)(?:[\'"])', url_part)
+        matches = SRC_ATTRIBUTE_RE.findall(url_part)
         if matches:
             urls.extend(matches)
         else:
             urls.append(url_part.strip())
     
-    urls = [url for url in urls if url.strip()]
+    return [url for url in urls if url.strip()]
+
+def check_image_urls_parallel(urls, max_workers=MAX_IMAGE_WORKERS):
+    """Check image URLs and return a mapping of URL to issue message
+    
+    URL checks run over the whole batch at once, with hosts resolved concurrently,
+    then the images of the URLs that pass are downloaded concurrently.
+    """
+    urls = pd.Series(list(urls), dtype=object)
+    if urls.empty:
+        return {}
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        url_valid, url_reasons = validate_urls_vectorized(urls, executor)
+        results = {
+            url: f"Invalid URL {url}: {reason}"
+            for url, reason in zip(urls[~url_valid], url_reasons[~url_valid])
+        }
+        
+        valid_urls = urls[url_valid].tolist()
+        for url, (dim_valid, dim_message) in zip(valid_urls, executor.map(validate_image_dimensions, valid_urls)):
+            results[url] = "" if dim_valid else f"Invalid dimensions for {url}: {dim_message}"
+    return results
+
+def validate_image_urls(urls_str, url_results=None):
+    """Validate multiple image URLs separated by semicolons
+    
+    url_results may hold messages already computed by check_image_urls_parallel;
+    URLs missing from it are checked with it on the spot.
+    """
+    if pd.isna(urls_str) or not urls_str:
+        return False, "Missing image URL"
+    
+    urls = extract_image_urls(urls_str)
     if not urls:
         return False, "No valid URLs found"
     
-    issues = []
-    for url in urls:
-        # Check URL validity
-        url_valid, url_message = is_valid_url(url)
-        if not url_valid:
-            issues.append(f"Invalid URL {url}: {url_message}")
-            continue
-            
-        # Check dimensions
-        dim_valid, dim_message = validate_image_dimensions(url)
-        if not dim_valid:
-            issues.append(f"Invalid dimensions for {url}: {dim_message}")
+    url_results = url_results or {}
+    unchecked = [url for url in dict.fromkeys(urls) if url not in url_results]
+    if unchecked:
+        url_results = {**url_results, **check_image_urls_parallel(unchecked)}
     
+    issues = [url_results[url] for url in urls if url_results[url]]
     if issues:
         return False, "; ".join(issues)
     return True, ""
 
-def validate_price(value):
-    """Validate price/cost values"""
-    if pd.isna(value):
-        return False, "Missing value"
-    try:
-        float_val = float(str(value).replace('$', '').strip())
-        if float_val <= 0:
-            return False, "Value must be greater than 0"
-        return True, float_val
-    except ValueError:
-        return False, "Invalid numeric value"
+def validate_image_column(image_srcs, url_results=None):
+    """Validate every Image Src cell, returning one message per cell
+    
+    Blank cells are skipped and get an empty message, like valid ones. Identical
+    cells, common across variants of one product, are validated once.
+    """
+    messages = {
+        urls_str: validate_image_urls(urls_str, url_results)[1]
+        for urls_str in image_srcs.dropna().unique()
+    }
+    return image_srcs.map(messages).fillna("").to_numpy(dtype=object)
 
-def validate_price_hierarchy(row):
-    """Validate price relationships"""
-    try:
-        price_valid, variant_price = validate_price(row['Variant Price'])
-        if not price_valid:
-            return False, f"Invalid Variant Price: {variant_price}"
-            
-        cost_valid, variant_cost = validate_price(row['Variant Cost'])
-        if not cost_valid:
-            return False, f"Invalid Variant Cost: {variant_cost}"
+def parse_prices(values):
+    """Parse a column of price/cost values
+    
+    Returns the numeric prices and a matching series of error messages. Prices
+    that are missing, non numeric or not greater than 0 are NaN and carry a message.
+    """
+    numbers = pd.to_numeric(
+        values.astype(str).str.replace('$', '', regex=False).str.strip(),
+        errors='coerce'
+    )
+    errors = pd.Series(np.select(
+        [values.isna(), numbers.isna(), numbers <= 0],
+        ["Missing value", "Invalid numeric value", "Value must be greater than 0"],
+        default=""
+    ), index=values.index)
+    return numbers.where(errors == ""), errors
 
-        # Optional price fields
-        trader_price = row.get('Variant Metafield:product.trader-price [single_line_text_field]')
-        dealer_price = row.get('Variant Metafield:product.dealer-price [single_line_text_field]')
-        
-        issues = []
-        
-        if trader_price:
-            trader_valid, trader_price = validate_price(trader_price)
-            if trader_valid and variant_price <= trader_price:
-                issues.append("Variant Price must be greater than Trader Price")
-                
-        if dealer_price:
-            dealer_valid, dealer_price = validate_price(dealer_price)
-            if dealer_valid:
-                if trader_price and trader_valid and trader_price <= dealer_price:
-                    issues.append("Trader Price must be greater than Dealer Price")
-                if dealer_price <= variant_cost:
-                    issues.append("Dealer Price must be greater than Variant Cost")
-                    
-        return len(issues) == 0, "; ".join(issues) if issues else ""
-        
-    except Exception as e:
-        return False, f"Price validation error: {str(e)}"
+def validate_price_hierarchy(variant_price, variant_cost, trader_price, dealer_price):
+    """Validate price relationships between parsed price columns
+    
+    Optional trader/dealer prices are NaN when missing or invalid, which skips their checks.
+    Returns one message per row, empty when all relationships hold.
+    """
+    checks = [
+        variant_price <= trader_price,
+        trader_price <= dealer_price,
+        dealer_price <= variant_cost,
+        dealer_price > variant_price / 1.2 * 0.9,
+    ]
+    # Encode the failed checks of each row as bits and look the message up by code
+    codes = np.zeros(len(variant_price), dtype=np.int8)
+    for bit, failed in enumerate(checks):
+        codes |= failed.to_numpy().astype(np.int8) << bit
+    return pd.Series(PRICE_HIERARCHY_MESSAGES[codes], index=variant_price.index)
+
+def validate_prices(df):
+    """Validate price fields for every row, returning one message per row"""
+    variant_price, price_errors = parse_prices(df['Variant Price'])
+    variant_cost, cost_errors = parse_prices(df['Variant Cost'])
+    
+    # Optional price fields
+    missing = pd.Series(np.nan, index=df.index)
+    trader_price = parse_prices(df[TRADER_PRICE_COLUMN])[0] if TRADER_PRICE_COLUMN in df.columns else missing
+    dealer_price = parse_prices(df[DEALER_PRICE_COLUMN])[0] if DEALER_PRICE_COLUMN in df.columns else missing
+    
+    hierarchy_messages = validate_price_hierarchy(variant_price, variant_cost, trader_price, dealer_price)
+    messages = np.select(
+        [price_errors != "", cost_errors != ""],
+        ["Invalid Variant Price: " + price_errors, "Invalid Variant Cost: " + cost_errors],
+        default=hierarchy_messages
+    )
+    return pd.Series(messages, index=df.index)
+
+def build_issues(skus=(), messages=()):
+    """Build the issues DataFrame from parallel SKU and message lists"""
+    return pd.DataFrame({'Variant SKU': skus, 'Message': messages}, columns=ISSUE_COLUMNS)
 
 def validate_product_data(file_path):
-    """Validate product data and return issues"""
+    """Validate product data and return a DataFrame of issues"""
     logger.info(f"Starting validation of file: {file_path}")
     
     try:
         # Read Excel file
-        df = pd.read_excel(file_path)
+        df = pd.read_excel(
+            file_path,
+            engine=EXCEL_READER_ENGINE,
+            usecols=lambda column: column in VALIDATED_COLUMNS,
+            dtype={column: TEXT_DTYPE for column in TEXT_COLUMNS}
+        )
         logger.info(f"Successfully loaded Excel file with {len(df)} rows")
         
         if df.empty:
             logger.error("The Excel file is empty")
-            return []
+            return build_issues()
             
         # Check required columns
-        required_columns = ['Variant SKU', 'Title', 'Variant Position', 'Variant Price', 'Variant Cost']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
         if missing_columns:
             logger.error(f"Missing required columns: {missing_columns}")
-            return []
+            return build_issues()
         
-        issues = []
-        total_rows = len(df)
+        # Check every distinct image URL up front instead of one at a time per row
+        image_results = {}
+        if 'Image Src' in df.columns:
+            unique_urls = {
+                url
+                for urls_str in df['Image Src'].dropna()
+                for url in extract_image_urls(urls_str)
+            }
+            logger.info(f"Checking {len(unique_urls)} unique image URLs")
+            image_results = check_image_urls_parallel(unique_urls)
         
-        # Process row-by-row validations
-        for index, row in df.iterrows():
-            sku = row['Variant SKU']
-            logger.info(f"Processing row {index + 1}/{total_rows}, SKU: {sku}")
-            
-            # Price hierarchy validation
-            price_valid, price_message = validate_price_hierarchy(row)
-            if not price_valid:
-                issues.append({
-                    'Variant SKU': sku,
-                    'Message': f'Price hierarchy issue: {price_message}'
-                })
-            
-            # Image validation if present
-            if 'Image Src' in df.columns and not pd.isna(row['Image Src']):
-                img_valid, img_message = validate_image_urls(row['Image Src'])
-                if not img_valid:
-                    issues.append({
-                        'Variant SKU': sku,
-                        'Message': f'Image issue: {img_message}'
-                    })
+        # One message per row for each rule, empty where the row passes
+        logger.info(f"Validating {len(df)} rows")
+        rule_messages = {
+            'Price hierarchy issue': validate_prices(df).to_numpy(dtype=object),
+        }
+        if 'Image Src' in df.columns:
+            rule_messages['Image issue'] = validate_image_column(df['Image Src'], image_results)
         
-        return issues
+        # Only rows failing at least one rule produce issues
+        failed = np.column_stack([messages != "" for messages in rule_messages.values()])
+        skus = df['Variant SKU'].to_numpy()
+        issue_skus = []
+        issue_messages = []
+        for row in np.flatnonzero(failed.any(axis=1)):
+            for (prefix, messages), rule_failed in zip(rule_messages.items(), failed[row]):
+                if rule_failed:
+                    issue_skus.append(skus[row])
+                    issue_messages.append(f'{prefix}: {messages[row]}')
+        
+        return build_issues(issue_skus, issue_messages)
         
     except Exception as e:
         logger.error(f"Error processing file: {str(e)}")
-        return []
+        return build_issues()
 
 def save_validation_results(validation_issues, input_file_path):
     """Save validation results to Excel file"""
-    if not validation_issues:
+    if validation_issues.empty:
         logger.info("No validation issues to save")
         return None
         
@@ -209,15 +350,13 @@ def save_validation_results(validation_issues, input_file_path):
             f'validation_issues_{timestamp}.xlsx'
         )
         
-        # Create DataFrame
-        issues_df = pd.DataFrame(validation_issues)
-        
         # Add categories
-        issues_df['Category'] = issues_df['Message'].apply(lambda x: 
-            'Price' if 'price' in x.lower() else
-            'Image' if 'image' in x.lower() else
-            'Other'
-        )
+        messages = validation_issues['Message'].str.lower()
+        issues_df = validation_issues.assign(Category=np.select(
+            [messages.str.contains('price', regex=False), messages.str.contains('image', regex=False)],
+            ['Price', 'Image'],
+            default='Other'
+        ))
         
         # Create summary
         summary = issues_df['Category'].value_counts().reset_index()
@@ -226,7 +365,7 @@ def save_validation_results(validation_issues, input_file_path):
         logger.info(f"Writing results to {output_file}")
         
         # Save to Excel
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        with pd.ExcelWriter(output_file, engine=EXCEL_WRITER_ENGINE) as writer:
             issues_df.to_excel(writer, sheet_name='Detailed Issues', index=False)
             summary.to_excel(writer, sheet_name='Summary', index=False)
             
@@ -253,7 +392,7 @@ def main():
     validation_issues = validate_product_data(args.input_file)
     
     # Save results if there are issues
-    if validation_issues:
+    if not validation_issues.empty:
         output_file = save_validation_results(validation_issues, args.input_file)
         if output_file:
             print(f"\nValidation complete. Found {len(validation_issues)} issues.")
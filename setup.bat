@@ -15,7 +15,10 @@ echo.
 
 REM Install main dependencies
 pip install pandas
+pip install numpy
 pip install openpyxl
+pip install python-calamine
+pip install xlsxwriter
 pip install requests
 pip install urllib3
 pip install Pillow